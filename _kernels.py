@@ -0,0 +1,32 @@
+"""
+Numba-compiled numerical kernels for the valuation models.
+"""
+
+from numba import njit
+
+
+# NumPy error model: wacc == t_growth yields inf, as the pandas path did
+@njit(cache=True, error_model="numpy")
+def dcf_core(current_rev, growths, gross_m, op_m_target, wacc, t_growth, risk, Y):
+    """Return (PV of FCF, terminal value, PV of terminal value, EV) for a DCF.
+
+    Mirrors DCFModel._project_arrays(): revenue compounds by `growths`,
+    operating margin ramps linearly from 30% of gross margin to the target,
+    and the terminal value uses the perpetuity growth method scaled by `risk`.
+    """
+    # Same arithmetic as np.linspace so margins match the projections table
+    start = gross_m * 0.3
+    step = (op_m_target - start) / (Y - 1) if Y > 1 else 0.0
+    
+    r = current_rev
+    fcf = 0.0
+    pv_fcf_sum = 0.0
+    for i in range(Y):
+        r *= (1 + growths[i])
+        margin = op_m_target if i == Y - 1 and Y > 1 else i * step + start
+        fcf = r * margin
+        pv_fcf_sum += fcf * (1 + wacc) ** -float(i + 1)
+    
+    terminal_value = (fcf * (1 + t_growth)) / (wacc - t_growth) * risk
+    pv_terminal = terminal_value / (1 + wacc) ** Y
+    return pv_fcf_sum, terminal_value, pv_terminal, pv_fcf_sum + pv_terminal
@@ -5,12 +5,12 @@ Run with: streamlit run app.py
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
 from valuation_tool import (
     StartupInputs, RevenueModel, ClinicalStage,
     DCFModel, ComparableCompanyAnalysis, VCMethod,
-    wacc_growth_sensitivity, STAGE_RISK_FACTORS
+    wacc_growth_sensitivity, STAGE_RISK_ARR, COMPARABLE_TICKERS
 )
 
 st.set_page_config(
@@ -19,6 +19,141 @@ st.set_page_config(
     layout="wide"
 )
 
+# Selectbox value -> enum lookups
+_RM_BY_VALUE = {rm.value: rm for rm in RevenueModel}
+_CS_BY_VALUE = {cs.value: cs for cs in ClinicalStage}
+
+# Chart layouts shared across reruns
+_REV_FCF_LAYOUT = dict(
+    yaxis=dict(title="Revenue ($M)"),
+    yaxis2=dict(title="FCF ($M)", overlaying="y", side="right"),
+    legend=dict(x=0.01, y=0.99),
+    hovermode="x unified"
+)
+_SENSITIVITY_LAYOUT = dict(
+    yaxis=dict(autorange="reversed")  # first WACC row on top, as in the table
+)
+_COMPS_BAR_LAYOUT = dict(xaxis_title="Company", yaxis_title="EV/Revenue")
+_VC_LAYOUT = dict(xaxis_title="Years", yaxis_title="Revenue ($M)")
+_STAGE_BAR_LAYOUT = dict(xaxis_title="Stage", yaxis_title="Enterprise Value ($M)")
+
+# Placeholder comparables table shown until market data arrives
+_SKELETON_DF = pd.DataFrame({
+    "Ticker": list(COMPARABLE_TICKERS),
+    "Company": list(COMPARABLE_TICKERS.values()),
+    **{col: "…" for col in [
+        "Market Cap ($M)", "Revenue ($M)", "EV ($M)", "EV/Revenue", "Revenue Growth"
+    ]},
+})
+
+# ============================================================================
+# CACHED COMPUTATIONS
+# ============================================================================
+
+@st.cache_data(show_spinner=False)
+def _dcf_valuation(inputs: StartupInputs) -> dict:
+    """DCF valuation, cached across reruns."""
+    return DCFModel(inputs).calculate_valuation()
+
+
+@st.cache_data(show_spinner=False)
+def _sensitivity_table(inputs: StartupInputs) -> pd.DataFrame:
+    """WACC vs terminal growth sensitivity table, cached across reruns."""
+    return wacc_growth_sensitivity(inputs)
+
+
+def _format_columns(df: pd.DataFrame, formats: dict) -> pd.DataFrame:
+    """Copy of df with the given columns pre-rendered as display strings."""
+    display_df = df.copy()
+    for col, fmt in formats.items():
+        display_df[col] = [fmt.format(v) for v in df[col]]
+    return display_df
+
+
+@st.cache_data(show_spinner=False)
+def _projections_display(inputs: StartupInputs) -> pd.DataFrame:
+    """Formatted projected financials table."""
+    projections = DCFModel(inputs).project_financials()
+    return _format_columns(projections, {
+        "Revenue ($M)": "${:.1f}",
+        "Operating Margin": "{:.1%}",
+        "FCF ($M)": "${:.1f}",
+        "Discount Factor": "{:.3f}",
+        "PV of FCF ($M)": "${:.1f}",
+    })
+
+
+@st.cache_data(show_spinner=False)
+def _comps_display(comp_data: pd.DataFrame) -> pd.DataFrame:
+    """Formatted comparable companies table."""
+    return _format_columns(comp_data, {
+        "Market Cap ($M)": "${:,.0f}",
+        "Revenue ($M)": "${:,.0f}",
+        "EV ($M)": "${:,.0f}",
+        "EV/Revenue": "{:.2f}x",
+        "Revenue Growth": "{:.1%}",
+    })
+
+
+@st.cache_data(show_spinner=False)
+def _sensitivity_display(inputs: StartupInputs) -> pd.DataFrame:
+    """Formatted WACC vs terminal growth sensitivity table."""
+    sensitivity_df = _sensitivity_table(inputs)
+    return _format_columns(sensitivity_df, dict.fromkeys(sensitivity_df.columns, "${:.1f}M"))
+
+
+@st.cache_resource(max_entries=64)
+def _make_rev_fcf_fig(years: tuple, revenue: tuple, fcf: tuple) -> go.Figure:
+    """Revenue bars with an FCF line on a secondary axis."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=years,
+        y=revenue,
+        name="Revenue",
+        marker_color="#2E86AB"
+    ))
+    fig.add_trace(go.Scatter(
+        x=years,
+        y=fcf,
+        name="Free Cash Flow",
+        mode="lines+markers",
+        marker_color="#A23B72",
+        yaxis="y2"
+    ))
+    fig.update_layout(title="Revenue & FCF Projections", **_REV_FCF_LAYOUT)
+    return fig
+
+
+@st.cache_resource(max_entries=64)
+def _make_waterfall_fig(pv_fcf: float, pv_tv: float, ev: float) -> go.Figure:
+    """Valuation bridge from PV of FCF and terminal value to EV."""
+    fig = go.Figure(go.Waterfall(
+        x=["PV of FCF", "PV of Terminal Value", "Enterprise Value"],
+        y=[pv_fcf, pv_tv, ev],
+        measure=["relative", "relative", "total"],
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+        increasing={"marker": {"color": "#2E86AB"}},
+        totals={"marker": {"color": "#28A745"}}
+    ))
+    fig.update_layout(title="DCF Valuation Components")
+    return fig
+
+
+@st.cache_resource(max_entries=64)
+def _make_sensitivity_fig(inputs: StartupInputs) -> go.Figure:
+    """Heatmap of the WACC vs terminal growth sensitivity table."""
+    sensitivity_df = _sensitivity_table(inputs)
+    fig = go.Figure(go.Heatmap(
+        z=sensitivity_df.values,
+        x=list(sensitivity_df.columns),
+        y=list(sensitivity_df.index),
+        colorscale="RdYlGn",
+        colorbar=dict(title="EV ($M)")
+    ))
+    fig.update_layout(title="Enterprise Value Sensitivity ($M)", **_SENSITIVITY_LAYOUT)
+    return fig
+
+
 st.title("💊 Healthcare Startup Valuation Tool")
 st.markdown("*DCF, Comparable Companies & VC Method for Digital Health Startups*")
 
@@ -44,7 +179,7 @@ with col2:
     y5_growth = st.number_input("Year 5", value=0.25, format="%.2f")
     terminal_growth = st.number_input("Terminal", value=0.03, format="%.2f")
 
-growth_rates = [y1_growth, y2_growth, y3_growth, y4_growth, y5_growth]
+growth_rates = (y1_growth, y2_growth, y3_growth, y4_growth, y5_growth)
 
 st.sidebar.subheader("Financial Assumptions")
 gross_margin = st.sidebar.slider("Gross Margin", 0.4, 0.9, 0.70)
@@ -64,8 +199,8 @@ clinical_stage = st.sidebar.selectbox(
 )
 
 # Convert selections back to enums
-revenue_model_enum = next(rm for rm in RevenueModel if rm.value == revenue_model)
-clinical_stage_enum = next(cs for cs in ClinicalStage if cs.value == clinical_stage)
+revenue_model_enum = _RM_BY_VALUE[revenue_model]
+clinical_stage_enum = _CS_BY_VALUE[clinical_stage]
 
 # Create inputs object
 inputs = StartupInputs(
@@ -92,12 +227,13 @@ tab1, tab2, tab3, tab4 = st.tabs([
 ])
 
 # --- TAB 1: DCF ---
-with tab1:
+@st.fragment
+def _render_dcf_tab(inputs: StartupInputs):
+    """DCF tab: projections, valuation metrics and charts."""
     st.header("Discounted Cash Flow Valuation")
     
-    dcf = DCFModel(inputs)
-    projections = dcf.project_financials()
-    results = dcf.calculate_valuation()
+    projections = DCFModel(inputs).project_financials()
+    results = _dcf_valuation(inputs)
     
     col1, col2, col3 = st.columns(3)
     col1.metric("Enterprise Value", f"${results['Enterprise Value ($M)']:.1f}M")
@@ -105,119 +241,129 @@ with tab1:
     col3.metric("Risk Adjustment", f"{results['Risk Adjustment Applied']:.0%}")
     
     st.subheader("Projected Financials")
-    st.dataframe(projections.style.format({
-        "Revenue ($M)": "${:.1f}",
-        "Operating Margin": "{:.1%}",
-        "FCF ($M)": "${:.1f}",
-        "Discount Factor": "{:.3f}",
-        "PV of FCF ($M)": "${:.1f}",
-    }), use_container_width=True)
+    st.dataframe(_projections_display(inputs), use_container_width=True)
     
     # Revenue projection chart
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=projections["Year"],
-        y=projections["Revenue ($M)"],
-        name="Revenue",
-        marker_color="#2E86AB"
-    ))
-    fig.add_trace(go.Scatter(
-        x=projections["Year"],
-        y=projections["FCF ($M)"],
-        name="Free Cash Flow",
-        mode="lines+markers",
-        marker_color="#A23B72",
-        yaxis="y2"
-    ))
-    fig.update_layout(
-        title="Revenue & FCF Projections",
-        yaxis=dict(title="Revenue ($M)"),
-        yaxis2=dict(title="FCF ($M)", overlaying="y", side="right"),
-        legend=dict(x=0.01, y=0.99),
-        hovermode="x unified"
+    fig = _make_rev_fcf_fig(
+        tuple(projections["Year"]),
+        tuple(projections["Revenue ($M)"]),
+        tuple(projections["FCF ($M)"]),
     )
     st.plotly_chart(fig, use_container_width=True)
     
     # Valuation waterfall
     st.subheader("Valuation Bridge")
-    waterfall_data = [
-        ("PV of FCF", results["PV of Projected FCF ($M)"]),
-        ("PV of Terminal Value", results["PV of Terminal Value ($M)"]),
-        ("Enterprise Value", results["Enterprise Value ($M)"]),
-    ]
-    fig_waterfall = go.Figure(go.Waterfall(
-        x=[x[0] for x in waterfall_data],
-        y=[x[1] for x in waterfall_data],
-        measure=["relative", "relative", "total"],
-        connector={"line": {"color": "rgb(63, 63, 63)"}},
-        increasing={"marker": {"color": "#2E86AB"}},
-        totals={"marker": {"color": "#28A745"}}
-    ))
-    fig_waterfall.update_layout(title="DCF Valuation Components")
+    fig_waterfall = _make_waterfall_fig(
+        results["PV of Projected FCF ($M)"],
+        results["PV of Terminal Value ($M)"],
+        results["Enterprise Value ($M)"],
+    )
     st.plotly_chart(fig_waterfall, use_container_width=True)
 
+
+with tab1:
+    _render_dcf_tab(inputs)
+
 # --- TAB 2: COMPS ---
-with tab2:
+def _fill_comps_slots(table_slot, metrics_slot, chart_slot, comp_data, comp_results):
+    """Render the comparables table, EV estimates and multiples chart into their slots."""
+    table_slot.dataframe(_comps_display(comp_data), use_container_width=True)
+    
+    with metrics_slot.container():
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Low Estimate", f"${comp_results['Implied EV - Low ($M)']:.1f}M")
+        col2.metric("Mid Estimate", f"${comp_results['Implied EV - Mid ($M)']:.1f}M")
+        col3.metric("High Estimate", f"${comp_results['Implied EV - High ($M)']:.1f}M")
+    
+    # Multiples comparison chart
+    multiples = comp_data["EV/Revenue"].to_numpy()
+    fig = go.Figure(go.Bar(
+        x=comp_data["Company"].to_numpy(),
+        y=multiples,
+        marker=dict(
+            color=multiples,
+            colorscale="Blues",
+            showscale=True,
+            colorbar=dict(title="EV/Revenue")
+        )
+    ))
+    fig.update_layout(title="EV/Revenue Multiples Comparison", **_COMPS_BAR_LAYOUT)
+    fig.add_hline(
+        y=comp_results["Median EV/Revenue Multiple"],
+        line_dash="dash",
+        annotation_text="Median"
+    )
+    chart_slot.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+def _render_comps_tab(inputs: StartupInputs):
+    """Comparable companies tab: live multiples and implied EV."""
     st.header("Comparable Company Analysis")
     
     comps = ComparableCompanyAnalysis(
-        target_revenue=current_revenue,
-        target_growth=growth_rates[0]
+        target_revenue=inputs.current_revenue,
+        target_growth=inputs.revenue_growth_rates[0]
     )
     
-    with st.spinner("Fetching live market data..."):
+    st.subheader("Public Healthcare Tech Comparables")
+    spinner_slot = st.empty()
+    table_slot = st.empty()
+    metrics_slot = st.empty()
+    chart_slot = st.empty()
+    
+    # Show last-known-good data, or a skeleton, before blocking on the fetch
+    last_comps = st.session_state.get("last_comps")
+    if last_comps is not None:
+        comps.comparables = last_comps
+        _fill_comps_slots(table_slot, metrics_slot, chart_slot,
+                          last_comps, comps.calculate_valuation())
+    else:
+        table_slot.dataframe(_SKELETON_DF, use_container_width=True)
+        with metrics_slot.container():
+            for col, label in zip(st.columns(3), ["Low Estimate", "Mid Estimate", "High Estimate"]):
+                col.metric(label, "—")
+    
+    with spinner_slot, st.spinner("Fetching live market data..."):
         comp_data = comps.fetch_comparables()
         comp_results = comps.calculate_valuation()
     
     if not comp_data.empty and "Error" not in comp_results:
-        st.subheader("Public Healthcare Tech Comparables")
-        st.dataframe(comp_data.style.format({
-            "Market Cap ($M)": "${:,.0f}",
-            "Revenue ($M)": "${:,.0f}",
-            "EV ($M)": "${:,.0f}",
-            "EV/Revenue": "{:.2f}x",
-            "Revenue Growth": "{:.1%}",
-        }), use_container_width=True)
-        
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Low Estimate", f"${comp_results['Implied EV - Low ($M)']:.1f}M")
-        col2.metric("Mid Estimate", f"${comp_results['Implied EV - Mid ($M)']:.1f}M")
-        col3.metric("High Estimate", f"${comp_results['Implied EV - High ($M)']:.1f}M")
-        
-        # Multiples comparison chart
-        fig = px.bar(
-            comp_data,
-            x="Company",
-            y="EV/Revenue",
-            title="EV/Revenue Multiples Comparison",
-            color="EV/Revenue",
-            color_continuous_scale="Blues"
-        )
-        fig.add_hline(
-            y=comp_results["Median EV/Revenue Multiple"],
-            line_dash="dash",
-            annotation_text="Median"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        # Slots already show this data when the cache hasn't moved on
+        if last_comps is None or not comp_data.equals(last_comps):
+            st.session_state["last_comps"] = comp_data
+            _fill_comps_slots(table_slot, metrics_slot, chart_slot, comp_data, comp_results)
+    elif last_comps is not None:
+        spinner_slot.warning("Could not refresh market data. Showing the last fetched comparables.")
     else:
-        st.warning("Could not fetch comparable company data. Yahoo Finance may be temporarily unavailable.")
+        table_slot.empty()
+        metrics_slot.empty()
+        spinner_slot.warning("Could not fetch comparable company data. Yahoo Finance may be temporarily unavailable.")
+
+
+with tab2:
+    _render_comps_tab(inputs)
 
 # --- TAB 3: VC METHOD ---
-with tab3:
+@st.fragment
+def _render_vc_tab(inputs: StartupInputs):
+    """VC method tab: exit-based valuation and revenue path."""
     st.header("VC Method Valuation")
     
     st.markdown("*Work backwards from expected exit to determine today's valuation*")
     
     col1, col2 = st.columns(2)
     with col1:
-        exit_revenue = st.number_input("Projected Exit Revenue ($M)", value=100.0, step=10.0)
+        exit_revenue = st.number_input(
+            "Projected Exit Revenue ($M)", min_value=0.1, value=100.0, step=10.0
+        )
         years_to_exit = st.slider("Years to Exit", 3, 10, 5)
     with col2:
         exit_multiple = st.number_input("Exit EV/Revenue Multiple", value=8.0, step=0.5)
         target_return = st.number_input("Target Return Multiple", value=5.0, step=0.5)
     
     vc = VCMethod(
-        current_revenue=current_revenue,
+        current_revenue=inputs.current_revenue,
         projected_exit_revenue=exit_revenue,
         years_to_exit=years_to_exit,
         exit_multiple=exit_multiple,
@@ -234,8 +380,8 @@ with tab3:
             f"requires an implied IRR of **{vc_results['Implied IRR']}**")
     
     # VC scenario chart
-    years = list(range(0, years_to_exit + 1))
-    revenue_path = [current_revenue * (exit_revenue/current_revenue)**(y/years_to_exit) for y in years]
+    years = np.arange(years_to_exit + 1)
+    revenue_path = np.geomspace(inputs.current_revenue, exit_revenue, years_to_exit + 1)
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(
@@ -244,68 +390,51 @@ with tab3:
         name="Revenue Growth Path",
         fill="tozeroy"
     ))
-    fig.update_layout(
-        title="Revenue Path to Exit",
-        xaxis_title="Years",
-        yaxis_title="Revenue ($M)"
-    )
+    fig.update_layout(title="Revenue Path to Exit", **_VC_LAYOUT)
     st.plotly_chart(fig, use_container_width=True)
 
+
+with tab3:
+    _render_vc_tab(inputs)
+
 # --- TAB 4: SENSITIVITY ---
-with tab4:
+@st.fragment
+def _render_sensitivity_tab(inputs: StartupInputs):
+    """Sensitivity tab: WACC/growth grid and stage risk impact."""
     st.header("Sensitivity Analysis")
     
     st.subheader("WACC vs Terminal Growth Rate")
-    sensitivity_df = wacc_growth_sensitivity(inputs)
     
     # Heatmap
-    fig = px.imshow(
-        sensitivity_df.values,
-        x=sensitivity_df.columns,
-        y=sensitivity_df.index,
-        color_continuous_scale="RdYlGn",
-        aspect="auto",
-        labels=dict(color="EV ($M)")
-    )
-    fig.update_layout(title="Enterprise Value Sensitivity ($M)")
+    fig = _make_sensitivity_fig(inputs)
     st.plotly_chart(fig, use_container_width=True)
     
-    st.dataframe(sensitivity_df.style.format("${:.1f}M"), use_container_width=True)
+    st.dataframe(_sensitivity_display(inputs), use_container_width=True)
     
     # Clinical stage impact
     st.subheader("Clinical Stage Risk Impact")
-    stage_impact = []
-    for stage in ClinicalStage:
-        modified_inputs = StartupInputs(
-            name=inputs.name,
-            current_revenue=inputs.current_revenue,
-            revenue_growth_rates=inputs.revenue_growth_rates,
-            terminal_growth_rate=inputs.terminal_growth_rate,
-            gross_margin=inputs.gross_margin,
-            operating_margin_target=inputs.operating_margin_target,
-            wacc=inputs.wacc,
-            revenue_model=inputs.revenue_model,
-            clinical_stage=stage,
-        )
-        dcf = DCFModel(modified_inputs)
-        val = dcf.calculate_valuation()
-        stage_impact.append({
-            "Stage": stage.value,
-            "Risk Factor": STAGE_RISK_FACTORS[stage],
-            "Enterprise Value ($M)": val["Enterprise Value ($M)"]
-        })
+    # Only the terminal value's risk factor varies by stage, so run the DCF once
+    pv_fcf_sum, pre_risk_pv_terminal = DCFModel(inputs)._raw_components()
+    risk_factors = STAGE_RISK_ARR
+    stage_ev = pv_fcf_sum + pre_risk_pv_terminal * risk_factors
     
-    stage_df = pd.DataFrame(stage_impact)
-    fig = px.bar(
-        stage_df,
-        x="Stage",
-        y="Enterprise Value ($M)",
-        color="Risk Factor",
-        color_continuous_scale="RdYlGn",
-        title="Valuation by Clinical/Regulatory Stage"
-    )
+    fig = go.Figure(go.Bar(
+        x=[cs.value for cs in ClinicalStage],
+        y=np.round(stage_ev, 2),
+        marker=dict(
+            color=risk_factors,
+            colorscale="RdYlGn",
+            showscale=True,
+            colorbar=dict(title="Risk Factor")
+        )
+    ))
+    fig.update_layout(title="Valuation by Clinical/Regulatory Stage", **_STAGE_BAR_LAYOUT)
     st.plotly_chart(fig, use_container_width=True)
 
+
+with tab4:
+    _render_sensitivity_tab(inputs)
+
 # ============================================================================
 # FOOTER
 # ============================================================================
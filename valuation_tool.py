@@ -7,10 +7,15 @@ using DCF, Comparable Company Analysis, and VC Method approaches.
 import pandas as pd
 import numpy as np
 import yfinance as yf
-from dataclasses import dataclass
+import streamlit as st
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Optional
 
+from _kernels import dcf_core
+
 # ============================================================================
 # CONFIGURATION & ENUMS
 # ============================================================================
@@ -38,6 +43,9 @@ STAGE_RISK_FACTORS = {
     ClinicalStage.REIMBURSED: 1.0,
 }
 
+# Same factors indexed by ClinicalStage ordinal (see StartupInputs._idx)
+STAGE_RISK_ARR = np.array([STAGE_RISK_FACTORS[stage] for stage in ClinicalStage], dtype=np.float64)
+
 # Public healthcare tech comparables (tickers)
 COMPARABLE_TICKERS = {
     "TDOC": "Teladoc Health",
@@ -49,12 +57,12 @@ COMPARABLE_TICKERS = {
 }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StartupInputs:
-    """Input parameters for startup valuation."""
+    """Input parameters for startup valuation (immutable, so usable as a cache key)."""
     name: str
     current_revenue: float  # in millions
-    revenue_growth_rates: list[float]  # year-over-year growth for projection period
+    revenue_growth_rates: tuple[float, ...]  # year-over-year growth for projection period
     terminal_growth_rate: float
     gross_margin: float
     operating_margin_target: float  # target margin at maturity
@@ -62,6 +70,12 @@ class StartupInputs:
     revenue_model: RevenueModel
     clinical_stage: ClinicalStage
     years_to_project: int = 5
+    _idx: int = field(init=False, repr=False, compare=False)  # clinical stage ordinal
+    
+    def __post_init__(self):
+        # Coerce lists so the instance stays hashable
+        object.__setattr__(self, "revenue_growth_rates", tuple(self.revenue_growth_rates))
+        object.__setattr__(self, "_idx", list(ClinicalStage).index(self.clinical_stage))
 
 
 # ============================================================================
@@ -74,16 +88,16 @@ class DCFModel:
     def __init__(self, inputs: StartupInputs):
         self.inputs = inputs
         self.projections = None
+        self._arrays = None
     
-    def project_financials(self) -> pd.DataFrame:
-        """Project revenue and cash flows over the forecast period."""
-        years = range(1, self.inputs.years_to_project + 1)
-        revenue = [self.inputs.current_revenue]
+    def _project_arrays(self) -> tuple[np.ndarray, ...]:
+        """Project (revenue, margin_ramp, fcf, discount_factors, pv_fcf) as arrays."""
+        years = np.arange(1, self.inputs.years_to_project + 1)
         
         # Project revenue with declining growth rates
-        for i, growth in enumerate(self.inputs.revenue_growth_rates):
-            revenue.append(revenue[-1] * (1 + growth))
-        revenue = revenue[1:]  # Remove base year
+        revenue = self.inputs.current_revenue * np.cumprod(
+            1 + np.asarray(self.inputs.revenue_growth_rates, dtype=np.float64)
+        )
         
         # Margin expansion from current to target
         margin_ramp = np.linspace(
@@ -92,12 +106,21 @@ class DCFModel:
             self.inputs.years_to_project
         )
         
-        fcf = [rev * margin for rev, margin in zip(revenue, margin_ramp)]
-        discount_factors = [(1 + self.inputs.wacc) ** -y for y in years]
-        pv_fcf = [f * d for f, d in zip(fcf, discount_factors)]
+        fcf = revenue * margin_ramp
+        discount_factors = (1 + self.inputs.wacc) ** -years.astype(np.float64)
+        pv_fcf = fcf * discount_factors
+        
+        self._arrays = (revenue, margin_ramp, fcf, discount_factors, pv_fcf)
+        return self._arrays
+    
+    def project_financials(self) -> pd.DataFrame:
+        """Project revenue and cash flows over the forecast period."""
+        if self._arrays is None:
+            self._project_arrays()
+        revenue, margin_ramp, fcf, discount_factors, pv_fcf = self._arrays
         
         self.projections = pd.DataFrame({
-            "Year": list(years),
+            "Year": list(range(1, self.inputs.years_to_project + 1)),
             "Revenue ($M)": revenue,
             "Operating Margin": margin_ramp,
             "FCF ($M)": fcf,
@@ -108,27 +131,47 @@ class DCFModel:
     
     def calculate_terminal_value(self) -> float:
         """Calculate terminal value using perpetuity growth method."""
-        if self.projections is None:
-            self.project_financials()
+        if self._arrays is None:
+            self._project_arrays()
         
-        final_fcf = self.projections["FCF ($M)"].iloc[-1]
+        final_fcf = self._arrays[2][-1]
         tv = (final_fcf * (1 + self.inputs.terminal_growth_rate)) / \
              (self.inputs.wacc - self.inputs.terminal_growth_rate)
         
         # Apply clinical stage risk adjustment
-        risk_factor = STAGE_RISK_FACTORS[self.inputs.clinical_stage]
+        risk_factor = STAGE_RISK_ARR[self.inputs._idx]
         return tv * risk_factor
     
+    def _run_kernel(self, risk_factor: float) -> tuple[float, float, float, float]:
+        """Run the compiled DCF kernel for these inputs."""
+        growths = np.asarray(self.inputs.revenue_growth_rates, dtype=np.float64)
+        # The kernel does no bounds checking, so fail loudly like project_financials()
+        if len(growths) != self.inputs.years_to_project:
+            raise ValueError(
+                f"Expected {self.inputs.years_to_project} revenue growth rates, "
+                f"got {len(growths)}"
+            )
+        return dcf_core(
+            self.inputs.current_revenue,
+            growths,
+            self.inputs.gross_margin,
+            self.inputs.operating_margin_target,
+            self.inputs.wacc,
+            self.inputs.terminal_growth_rate,
+            risk_factor,
+            self.inputs.years_to_project,
+        )
+    
+    def _raw_components(self) -> tuple[float, float]:
+        """Return (PV of FCF, PV of terminal value before the stage risk factor)."""
+        pv_fcf_sum, _, pre_risk_pv_terminal, _ = self._run_kernel(1.0)
+        return pv_fcf_sum, pre_risk_pv_terminal
+    
     def calculate_valuation(self) -> dict:
         """Calculate enterprise value via DCF."""
-        if self.projections is None:
-            self.project_financials()
-        
-        pv_fcf_sum = self.projections["PV of FCF ($M)"].sum()
-        terminal_value = self.calculate_terminal_value()
-        pv_terminal = terminal_value / (1 + self.inputs.wacc) ** self.inputs.years_to_project
-        
-        enterprise_value = pv_fcf_sum + pv_terminal
+        risk_factor = STAGE_RISK_ARR[self.inputs._idx]
+        pv_fcf_sum, terminal_value, pv_terminal, enterprise_value = \
+            self._run_kernel(risk_factor)
         
         return {
             "PV of Projected FCF ($M)": round(pv_fcf_sum, 2),
@@ -136,10 +179,83 @@ class DCFModel:
             "PV of Terminal Value ($M)": round(pv_terminal, 2),
             "Enterprise Value ($M)": round(enterprise_value, 2),
             "Implied EV/Revenue Multiple": round(enterprise_value / self.inputs.current_revenue, 1),
-            "Risk Adjustment Applied": STAGE_RISK_FACTORS[self.inputs.clinical_stage],
+            "Risk Adjustment Applied": risk_factor,
         }
 
 
+# ============================================================================
+# MARKET DATA
+# ============================================================================
+
+def _fetch_one(stock: yf.Ticker, ticker: str) -> Optional[tuple[float, ...]]:
+    """Fetch (market cap, revenue, EV, EV/revenue, growth) for a single ticker."""
+    try:
+        info = stock.info
+        
+        market_cap = info.get("marketCap", 0) / 1e6  # Convert to millions
+        revenue = info.get("totalRevenue", 0) / 1e6
+        ev = info.get("enterpriseValue", 0) / 1e6
+        growth = info.get("revenueGrowth", 0)
+        
+        if revenue > 0:
+            return (
+                round(market_cap, 1),
+                round(revenue, 1),
+                round(ev, 1),
+                round(ev / revenue, 2),
+                growth if growth is not None else np.nan,
+            )
+    except Exception as e:
+        print(f"Error fetching {ticker}: {e}")
+    return None
+
+
+# Streamlit ignores ttl on disk-persisted caches, so expiry is enforced by
+# passing the current TTL window as part of the cache key instead
+COMPS_CACHE_TTL = 21600  # seconds (6h)
+
+
+@st.cache_data(persist="disk", max_entries=8, show_spinner=False)
+def _fetch_comparables_df(
+    tickers: tuple[tuple[str, str], ...], ttl_window: int
+) -> pd.DataFrame:
+    """Fetch trading data for (ticker, name) pairs, cached on disk per TTL window."""
+    # One Tickers batch shares a session (cookies, crumb) across symbols;
+    # each .info call still blocks on HTTP, so overlap them
+    batch = yf.Tickers(" ".join(ticker for ticker, _ in tickers))
+    
+    # Fill columns by index rather than collecting row dicts
+    n = len(tickers)
+    mcaps = np.empty(n)
+    revs = np.empty(n)
+    evs = np.empty(n)
+    multiples = np.empty(n)
+    growths = np.empty(n)
+    ok = np.zeros(n, dtype=bool)
+    
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        results = ex.map(lambda t: _fetch_one(batch.tickers[t], t), (t for t, _ in tickers))
+        for i, result in enumerate(results):
+            if result is not None:
+                mcaps[i], revs[i], evs[i], multiples[i], growths[i] = result
+                ok[i] = True
+    
+    if not ok.any():
+        # Raising keeps an outage from being persisted for the whole window
+        raise RuntimeError("No comparable company data could be fetched")
+    
+    kept = [pair for pair, keep in zip(tickers, ok) if keep]
+    return pd.DataFrame({
+        "Ticker": [ticker for ticker, _ in kept],
+        "Company": [name for _, name in kept],
+        "Market Cap ($M)": mcaps[ok],
+        "Revenue ($M)": revs[ok],
+        "EV ($M)": evs[ok],
+        "EV/Revenue": multiples[ok],
+        "Revenue Growth": growths[ok],
+    })
+
+
 class ComparableCompanyAnalysis:
     """Valuation using public healthcare tech company multiples."""
     
@@ -150,32 +266,14 @@ class ComparableCompanyAnalysis:
     
     def fetch_comparables(self) -> pd.DataFrame:
         """Fetch current trading multiples for comparable companies."""
-        data = []
-        
-        for ticker, name in COMPARABLE_TICKERS.items():
-            try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                
-                market_cap = info.get("marketCap", 0) / 1e6  # Convert to millions
-                revenue = info.get("totalRevenue", 0) / 1e6
-                ev = info.get("enterpriseValue", 0) / 1e6
-                growth = info.get("revenueGrowth", 0)
-                
-                if revenue > 0:
-                    data.append({
-                        "Ticker": ticker,
-                        "Company": name,
-                        "Market Cap ($M)": round(market_cap, 1),
-                        "Revenue ($M)": round(revenue, 1),
-                        "EV ($M)": round(ev, 1),
-                        "EV/Revenue": round(ev / revenue, 2) if revenue else None,
-                        "Revenue Growth": growth,
-                    })
-            except Exception as e:
-                print(f"Error fetching {ticker}: {e}")
-        
-        self.comparables = pd.DataFrame(data)
+        try:
+            self.comparables = _fetch_comparables_df(
+                tuple(COMPARABLE_TICKERS.items()),
+                int(time.time() // COMPS_CACHE_TTL),
+            )
+        except RuntimeError as e:
+            print(f"Error fetching comparables: {e}")
+            self.comparables = pd.DataFrame()
         return self.comparables
     
     def calculate_valuation(self, apply_growth_premium: bool = True) -> dict:
@@ -276,27 +374,34 @@ def wacc_growth_sensitivity(
     waccs = np.linspace(wacc_range[0], wacc_range[1], steps)
     growths = np.linspace(growth_range[0], growth_range[1], steps)
     
-    results = []
-    for w in waccs:
-        row = {"WACC": f"{w:.1%}"}
-        for g in growths:
-            modified = StartupInputs(
-                name=inputs.name,
-                current_revenue=inputs.current_revenue,
-                revenue_growth_rates=inputs.revenue_growth_rates,
-                terminal_growth_rate=g,
-                gross_margin=inputs.gross_margin,
-                operating_margin_target=inputs.operating_margin_target,
-                wacc=w,
-                revenue_model=inputs.revenue_model,
-                clinical_stage=inputs.clinical_stage,
-            )
-            dcf = DCFModel(modified)
-            val = dcf.calculate_valuation()
-            row[f"g={g:.1%}"] = round(val["Enterprise Value ($M)"], 1)
-        results.append(row)
+    # The DCF is closed-form, so evaluate the whole grid at once:
+    # waccs run down axis 0, terminal growth rates across axis 1.
+    Y = inputs.years_to_project
+    revenue = inputs.current_revenue * np.cumprod(1 + np.asarray(inputs.revenue_growth_rates[:Y]))
+    margins = np.linspace(inputs.gross_margin * 0.3, inputs.operating_margin_target, Y)
+    fcf = revenue * margins
+    
+    # Discount factors and PV of FCF depend only on WACC: one row per wacc
+    years = np.arange(1, Y + 1)
+    disc = (1 + waccs[:, None]) ** -years[None, :].astype(np.float64)
+    pv_fcf_sum = (fcf[None, :] * disc).sum(axis=1)  # (nw,)
+    
+    # Only the terminal value needs the full grid
+    W = waccs[:, None]
+    G = growths[None, :]
+    risk_factor = STAGE_RISK_ARR[inputs._idx]
+    tv = fcf[-1] * (1 + G) / (W - G)
+    pv_terminal_grid = tv * risk_factor / (1 + W) ** Y
     
-    return pd.DataFrame(results).set_index("WACC")
+    # Round to cents first, as calculate_valuation() does, so cells match
+    # a per-cell DCFModel run exactly
+    ev = np.round(np.round(pv_fcf_sum[:, None] + pv_terminal_grid, 2), 1)
+    
+    return pd.DataFrame(
+        ev,
+        index=pd.Index([f"{w:.1%}" for w in waccs], name="WACC"),
+        columns=[f"g={g:.1%}" for g in growths],
+    )
 
 
 # ============================================================================
@@ -308,7 +413,7 @@ if __name__ == "__main__":
     startup = StartupInputs(
         name="HealthTech Example Co",
         current_revenue=15.0,  # $15M ARR
-        revenue_growth_rates=[0.80, 0.60, 0.45, 0.35, 0.25],  # Declining growth
+        revenue_growth_rates=(0.80, 0.60, 0.45, 0.35, 0.25),  # Declining growth
         terminal_growth_rate=0.03,
         gross_margin=0.70,
         operating_margin_target=0.20,